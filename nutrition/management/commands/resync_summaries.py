@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from nutrition.models import FoodEntry, DailySummary
+from nutrition.summaries import resync_daily_summaries
+
+
+class Command(BaseCommand):
+    help = "Rebuild DailySummary rows that have drifted from their FoodEntry totals."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drifted summaries; exit with status 1 if any are found.",
+        )
+
+    def handle(self, *args, **options):
+        to_update, to_create = resync_daily_summaries(
+            FoodEntry, DailySummary, check=options["check"]
+        )
+
+        if options["check"]:
+            drift_count = len(to_update) + len(to_create)
+            if drift_count:
+                raise CommandError(f"{drift_count} daily summaries out of sync.", returncode=1)
+            self.stdout.write("All daily summaries in sync.")
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated {len(to_update)} and created {len(to_create)} daily summaries."
+        ))
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-15 09:21
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+def populate_name_normalized(apps, schema_editor):
+    # historical models don't carry FoodItem.normalize_name, and SQL TRIM only
+    # strips spaces, so mirror str.strip().lower() here
+    FoodItem = apps.get_model('nutrition', 'FoodItem')
+    items = list(FoodItem.objects.only('pk', 'name'))
+    for item in items:
+        item.name_normalized = (item.name or '').strip().lower()
+    FoodItem.objects.bulk_update(items, ['name_normalized'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition', '0003_alter_foodentry_source_food_id'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='fooditem',
+            name='name_normalized',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(populate_name_normalized, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name_normalized'], name='fooditem_name_norm_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RemoveIndex(
+            model_name='fooditem',
+            name='nutrition_f_name_cad16d_idx',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-15 09:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition', '0004_fooditem_name_normalized'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='foodentry',
+            index=models.Index(fields=['user', 'date'], include=('calories', 'carbs_g', 'protein_g', 'fat_g'), name='fe_user_date_macros_cov'),
+        ),
+        migrations.RemoveIndex(
+            model_name='foodentry',
+            name='nutrition_f_user_id_bc7262_idx',
+        ),
+    ]
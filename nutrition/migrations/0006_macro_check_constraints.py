@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-15 09:27
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest
+
+
+def clean_invalid_macros(apps, schema_editor):
+    """Bring rows the old schema allowed into line so the CHECK constraints can be added."""
+    FoodItem = apps.get_model('nutrition', 'FoodItem')
+    FoodEntry = apps.get_model('nutrition', 'FoodEntry')
+
+    # these are real user logs, so keep them: raise a non-positive weight to the
+    # smallest amount the serializer accepts (amount_g min_value) and clamp
+    # negative macros to zero. One UPDATE per table -- a row updated twice in this
+    # transaction queues deferred FK checks that block the ALTER TABLEs below.
+    for model, fields, weight_field in (
+        (FoodEntry, ['carbs_g', 'protein_g', 'fat_g', 'calories'], 'weight_g'),
+        (FoodItem, ['carbs_per_100g', 'protein_per_100g', 'fat_per_100g', 'calories_per_100g'], None),
+    ):
+        invalid = Q(pk__in=[])
+        changes = {}
+        for field in fields:
+            invalid |= Q(**{f'{field}__lt': 0})
+            changes[field] = Greatest(field, Value(0.0))
+        if weight_field:
+            invalid |= Q(**{f'{weight_field}__lte': 0})
+            changes[weight_field] = Case(
+                When(**{f'{weight_field}__lte': 0}, then=Value(0.01)),
+                default=F(weight_field),
+            )
+        model.objects.filter(invalid).update(**changes)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition', '0005_foodentry_covering_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(clean_invalid_macros, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='foodentry',
+            constraint=models.CheckConstraint(condition=models.Q(('weight_g__gt', 0)), name='foodentry_weight_positive'),
+        ),
+        migrations.AddConstraint(
+            model_name='foodentry',
+            constraint=models.CheckConstraint(condition=models.Q(('carbs_g__gte', 0), ('protein_g__gte', 0), ('fat_g__gte', 0), ('calories__gte', 0)), name='foodentry_macros_non_negative'),
+        ),
+        migrations.AddConstraint(
+            model_name='fooditem',
+            constraint=models.CheckConstraint(condition=models.Q(('carbs_per_100g__gte', 0), ('protein_per_100g__gte', 0), ('fat_per_100g__gte', 0), ('calories_per_100g__gte', 0)), name='fooditem_macros_non_negative'),
+        ),
+    ]
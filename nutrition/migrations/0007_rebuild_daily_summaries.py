@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from nutrition.summaries import resync_daily_summaries
+
+
+def rebuild_daily_summaries(apps, schema_editor):
+    # log_food did not maintain DailySummary before; rebuild so /summaries/ starts correct
+    resync_daily_summaries(
+        apps.get_model('nutrition', 'FoodEntry'),
+        apps.get_model('nutrition', 'DailySummary'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition', '0006_macro_check_constraints'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_daily_summaries, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.core.validators import MinValueValidator
 from django.utils import timezone
@@ -19,6 +20,8 @@ class FoodItem(models.Model):
         help_text="ID from the API (nullable for custom/local foods)"
     )
     name = models.CharField(max_length=255)
+    # lowercased/stripped copy of name for indexed exact and trigram lookups
+    name_normalized = models.CharField(max_length=255, db_index=True, editable=False, default="")
     serving_size_g = models.FloatField(
         null=True, blank=True,
         help_text="Typical serving mass in grams if provided by source"
@@ -36,12 +39,38 @@ class FoodItem(models.Model):
         unique_together = ("source", "source_food_id")
         indexes = [
             models.Index(fields=["source", "source_food_id"]),
-            models.Index(fields=["name"]),
+            GinIndex(
+                fields=["name_normalized"],
+                opclasses=["gin_trgm_ops"],
+                name="fooditem_name_norm_trgm",
+            ),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(carbs_per_100g__gte=0)
+                    & models.Q(protein_per_100g__gte=0)
+                    & models.Q(fat_per_100g__gte=0)
+                    & models.Q(calories_per_100g__gte=0)
+                ),
+                name="fooditem_macros_non_negative",
+            ),
         ]
 
     def __str__(self):
         return f"{self.name} ({self.source})"
 
+    @staticmethod
+    def normalize_name(name: str) -> str:
+        return (name or "").strip().lower()
+
+    def save(self, *args, **kwargs):
+        self.name_normalized = self.normalize_name(self.name)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "name_normalized"}
+        super().save(*args, **kwargs)
+
     def macros_for_grams(self, grams: float):
         """
         Return computed macros for a given grams based on per-100g values.
@@ -92,7 +121,28 @@ class FoodEntry(models.Model):
     
     class Meta:
         indexes = [
-            models.Index(fields=["user", "date"]),
+            # covering index: per-day macro sums can be answered by an index-only scan
+            models.Index(
+                fields=["user", "date"],
+                include=["calories", "carbs_g", "protein_g", "fat_g"],
+                name="fe_user_date_macros_cov",
+            ),
+        ]
+        # bulk_create paths skip field validators, so enforce the same bounds in the DB
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(weight_g__gt=0),
+                name="foodentry_weight_positive",
+            ),
+            models.CheckConstraint(
+                condition=(
+                    models.Q(carbs_g__gte=0)
+                    & models.Q(protein_g__gte=0)
+                    & models.Q(fat_g__gte=0)
+                    & models.Q(calories__gte=0)
+                ),
+                name="foodentry_macros_non_negative",
+            ),
         ]
         ordering = ["-timestamp"]
 
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from .models import FoodItem, FoodEntry, DailySummary
-import requests
-from django.conf import settings
+from .services import (
+    fetch_nutritionix, food_item_from_nutritionix, resolve_local_foods, upsert_tagged_items,
+)
 
 
 class FoodItemSerializer(serializers.ModelSerializer):
@@ -18,7 +19,7 @@ class FoodItemSerializer(serializers.ModelSerializer):
 class FoodEntrySerializer(serializers.ModelSerializer):
     # Custom input fields
     food = serializers.CharField(write_only=True)
-    amount_g = serializers.FloatField(write_only=True)
+    amount_g = serializers.FloatField(write_only=True, min_value=0.01)
 
     class Meta:
         model = FoodEntry
@@ -34,35 +35,30 @@ class FoodEntrySerializer(serializers.ModelSerializer):
         food_name = validated_data.pop("food")
         amount_g = validated_data.pop("amount_g")
 
-        # 1. Try to find locally
-        food_item = FoodItem.objects.filter(name__icontains=food_name).first()
+        # 1. Try to find locally (exact name, then closest trigram match)
+        food_item = resolve_local_foods([food_name]).get(FoodItem.normalize_name(food_name))
 
         # 2. If not found, fetch from Nutritionix
         if not food_item:
-            url = "https://trackapi.nutritionix.com/v2/natural/nutrients"
-            headers = {
-                "x-app-id": settings.NUTRITIONIX_APP_ID,
-                "x-app-key": settings.NUTRITIONIX_API_KEY,
-                "Content-Type": "application/json",
-            }
-            payload = {"query": food_name}
-            r = requests.post(url, headers=headers, json=payload, timeout=10)
-            r.raise_for_status()
-            data = r.json()
-            if not data.get("foods"):
+            foods = fetch_nutritionix(food_name)
+            if not foods:
                 raise serializers.ValidationError({"food": f"{food_name} not found in Nutritionix"})
 
-            f = data["foods"][0]
-            weight = float(f.get("serving_weight_grams") or 100)
-            food_item = FoodItem.objects.create(
-                source="nutritionix",
-                source_food_id=f.get("tag_id", ""),
-                name=f.get("food_name") or food_name,
-                calories_per_100g=float(f.get("nf_calories", 0)) * (100 / weight),
-                protein_per_100g=float(f.get("nf_protein", 0)) * (100 / weight),
-                carbs_per_100g=float(f.get("nf_total_carbohydrate", 0)) * (100 / weight),
-                fat_per_100g=float(f.get("nf_total_fat", 0)) * (100 / weight),
-            )
+            f = foods[0]
+            tag_id = (f.get("tag_id") or "").strip()
+            if tag_id:
+                # same ON CONFLICT upsert as log_food: the tag may already be cached
+                # under a name the local lookup didn't match
+                food_item = upsert_tagged_items([food_item_from_nutritionix(f, food_name, tag_id)])[tag_id]
+            else:
+                # untagged foods are keyed by name, as in log_food and bulk_log
+                new_item = food_item_from_nutritionix(f, food_name, None)
+                food_item = FoodItem.objects.filter(
+                    source="nutritionix", name_normalized=new_item.name_normalized
+                ).order_by("pk").first()
+                if not food_item:
+                    new_item.save()
+                    food_item = new_item
 
         # 3. Calculate macros
         macros = food_item.macros_for_grams(amount_g)
@@ -83,13 +79,12 @@ class FoodEntrySerializer(serializers.ModelSerializer):
 
 
 class DailySummarySerializer(serializers.ModelSerializer):
+    """
+    Reads the denormalized totals stored on DailySummary, which FoodEntryViewSet
+    keeps in sync on create/update/destroy (see the resync_summaries command).
+    """
     user = serializers.PrimaryKeyRelatedField(read_only=True)
 
-    total_calories = serializers.SerializerMethodField()
-    total_carbs_g = serializers.SerializerMethodField()
-    total_protein_g = serializers.SerializerMethodField()
-    total_fat_g = serializers.SerializerMethodField()
-
     class Meta:
         model = DailySummary
         fields = [
@@ -97,16 +92,7 @@ class DailySummarySerializer(serializers.ModelSerializer):
             "total_calories", "total_carbs_g", "total_protein_g", "total_fat_g",
             "updated_at"
         ]
-        read_only_fields = ["id", "updated_at"]
-
-    def get_total_calories(self, obj):
-        return round(sum(entry.calories for entry in obj.user.food_entries.filter(date=obj.date)), 2)
-
-    def get_total_carbs_g(self, obj):
-        return round(sum(entry.carbs_g for entry in obj.user.food_entries.filter(date=obj.date)), 2)
-
-    def get_total_protein_g(self, obj):
-        return round(sum(entry.protein_g for entry in obj.user.food_entries.filter(date=obj.date)), 2)
-
-    def get_total_fat_g(self, obj):
-        return round(sum(entry.fat_g for entry in obj.user.food_entries.filter(date=obj.date)), 2)
+        read_only_fields = [
+            "id", "updated_at",
+            "total_calories", "total_carbs_g", "total_protein_g", "total_fat_g",
+        ]
@@ -0,0 +1,161 @@
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+import requests
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .models import FoodItem
+
+NUTRITIONIX_URL = "https://trackapi.nutritionix.com/v2/natural/nutrients"
+NUTRITIONIX_CACHE_TTL = 60 * 60
+# short TTL for empty results so typos don't get re-sent on every keystroke
+NUTRITIONIX_EMPTY_CACHE_TTL = 60
+
+# only the fields read by views/serializers are kept in the cache
+NUTRITIONIX_FOOD_FIELDS = (
+    "food_name", "tag_id", "serving_weight_grams",
+    "nf_calories", "nf_protein", "nf_total_carbohydrate", "nf_total_fat",
+)
+
+_local = threading.local()
+
+# Long-lived pool for concurrent lookups. Its threads outlive requests, so the
+# per-thread sessions (and cache connections) they open are reused across calls.
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="nutritionix")
+
+
+def _build_session():
+    # 5xx only: 429 means quota is exhausted, and retrying (or sleeping on
+    # Retry-After) would tie up the request thread and spend more quota
+    retry = Retry(
+        total=2,
+        backoff_factor=0.3,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "POST"}),
+        respect_retry_after_header=False,
+    )
+    # each session is used by one thread at a time, so one keep-alive connection is enough
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    return session
+
+
+def _get_session():
+    """Per-thread keep-alive session; requests.Session is not documented as thread-safe."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = _build_session()
+    return session
+
+
+def _cache_key(query):
+    digest = hashlib.sha1(query.strip().lower().encode()).hexdigest()
+    return f"nutritionix:{digest}"
+
+
+def fetch_nutritionix(query):
+    """
+    Return the list of foods Nutritionix matches for a natural-language query.
+    Results are cached per normalized query; raises requests.RequestException on failure.
+    """
+    key = _cache_key(query)
+    foods = cache.get(key)
+    if foods is not None:
+        return foods
+
+    headers = {
+        "x-app-id": settings.NUTRITIONIX_APP_ID,
+        "x-app-key": settings.NUTRITIONIX_API_KEY,
+        "Content-Type": "application/json",
+    }
+    r = _get_session().post(NUTRITIONIX_URL, headers=headers, json={"query": query}, timeout=10)
+    r.raise_for_status()
+    try:
+        data = orjson.loads(r.content)
+    except orjson.JSONDecodeError as exc:
+        # keep callers' RequestException handling (r.json() raised a subclass of it)
+        raise requests.exceptions.InvalidJSONError(str(exc), response=r) from exc
+
+    foods = [
+        {field: food[field] for field in NUTRITIONIX_FOOD_FIELDS if field in food}
+        for food in data.get("foods", [])
+    ]
+    cache.set(key, foods, NUTRITIONIX_CACHE_TTL if foods else NUTRITIONIX_EMPTY_CACHE_TTL)
+    return foods
+
+
+def fetch_nutritionix_many(queries):
+    """fetch_nutritionix for several queries concurrently; results in query order, first failure re-raised."""
+    return list(_executor.map(fetch_nutritionix, queries))
+
+
+def food_item_from_nutritionix(food, query, tag_id):
+    """Build an unsaved FoodItem from a Nutritionix food, scaled to per-100g values."""
+    weight = float(food.get("serving_weight_grams") or 100)
+    return FoodItem(
+        source="nutritionix",
+        source_food_id=tag_id,
+        name=food.get("food_name") or query,
+        name_normalized=FoodItem.normalize_name(food.get("food_name") or query),
+        calories_per_100g=float(food.get("nf_calories", 0)) * (100 / weight),
+        protein_per_100g=float(food.get("nf_protein", 0)) * (100 / weight),
+        carbs_per_100g=float(food.get("nf_total_carbohydrate", 0)) * (100 / weight),
+        fat_per_100g=float(food.get("nf_total_fat", 0)) * (100 / weight),
+    )
+
+
+def upsert_tagged_items(items):
+    """
+    Insert or refresh tagged FoodItems in one INSERT ... ON CONFLICT DO UPDATE.
+    Returns {source_food_id: item}; pks come back from RETURNING.
+    """
+    if not items:
+        return {}
+    return {
+        item.source_food_id: item
+        for item in FoodItem.objects.bulk_create(
+            items,
+            update_conflicts=True,
+            unique_fields=["source", "source_food_id"],
+            update_fields=[
+                "name", "name_normalized",
+                "calories_per_100g", "protein_per_100g",
+                "carbs_per_100g", "fat_per_100g",
+                "last_synced",
+            ],
+        )
+    }
+
+
+def resolve_local_foods(names):
+    """
+    Match food names against cached FoodItems: exact normalized match first (btree),
+    then the closest trigram match (GIN-indexed % operator, narrowed to similarity > 0.5).
+    Returns {normalized_name: FoodItem} for the names that matched.
+
+    Costs one query for all exact matches plus one trigram query per name that
+    missed, i.e. 1 + M queries for M misses.
+    """
+    pending = {FoodItem.normalize_name(name) for name in names}
+    found = {}
+    for item in FoodItem.objects.filter(name_normalized__in=pending).order_by("pk"):
+        found.setdefault(item.name_normalized, item)
+
+    for name in pending - found.keys():
+        item = (
+            FoodItem.objects.filter(name_normalized__trigram_similar=name)
+            .annotate(similarity=TrigramSimilarity("name_normalized", name))
+            .filter(similarity__gt=0.5)
+            .order_by("-similarity", "pk")
+            .first()
+        )
+        if item:
+            found[name] = item
+    return found
@@ -0,0 +1,82 @@
+import operator
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+TOTAL_FIELDS = ["total_calories", "total_carbs_g", "total_protein_g", "total_fat_g"]
+TOLERANCE = 0.01
+
+
+def _entry_totals(entries):
+    return {
+        (row["user"], row["date"]): row
+        for row in entries.values("user", "date").annotate(
+            total_calories=Sum("calories"),
+            total_carbs_g=Sum("carbs_g"),
+            total_protein_g=Sum("protein_g"),
+            total_fat_g=Sum("fat_g"),
+        ).order_by()
+    }
+
+
+def _drifted(summaries, expected, now):
+    """Set the expected totals on drifted summaries and return them; pops matched keys from `expected`."""
+    drifted = []
+    for summary in summaries:
+        row = expected.pop((summary.user_id, summary.date), None)
+        changed = False
+        for field in TOTAL_FIELDS:
+            value = (row[field] or 0.0) if row else 0.0
+            if abs(getattr(summary, field) - value) > TOLERANCE:
+                setattr(summary, field, value)
+                changed = True
+        if changed:
+            summary.updated_at = now
+            drifted.append(summary)
+    return drifted
+
+
+def resync_daily_summaries(food_entry_model, daily_summary_model, check=False):
+    """
+    Rebuild DailySummary rows that have drifted from their FoodEntry totals.
+    Models are passed in so data migrations can use their historical versions.
+    Returns (to_update, to_create); with `check`, nothing is written or locked.
+    """
+    now = timezone.now()
+    expected = _entry_totals(food_entry_model.objects.all())
+    to_update = _drifted(daily_summary_model.objects.all(), expected, now)
+
+    # user/day pairs with entries but no summary row at all
+    to_create = [
+        daily_summary_model(
+            user_id=user_id,
+            date=date,
+            **{field: row[field] or 0.0 for field in TOTAL_FIELDS},
+        )
+        for (user_id, date), row in expected.items()
+    ]
+
+    if check or not (to_update or to_create):
+        return to_update, to_create
+
+    with transaction.atomic():
+        if to_update:
+            # Lock only the drifted rows, in (user, date) order -- the order writers
+            # take them in -- then re-aggregate their entries under the lock: a
+            # concurrent writer that has inserted entries but not yet applied its
+            # F() delta blocks until we commit and adds its delta on top.
+            keys = reduce(operator.or_, (Q(user_id=s.user_id, date=s.date) for s in to_update))
+            locked = list(
+                daily_summary_model.objects.filter(keys)
+                .order_by("user_id", "date")
+                .select_for_update()
+            )
+            expected = _entry_totals(food_entry_model.objects.filter(keys))
+            to_update = _drifted(locked, expected, now)
+            daily_summary_model.objects.bulk_update(to_update, TOTAL_FIELDS + ["updated_at"])
+        # a row created concurrently since the scan already carries its own delta
+        daily_summary_model.objects.bulk_create(to_create, ignore_conflicts=True)
+
+    return to_update, to_create
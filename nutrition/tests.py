@@ -1,3 +1,411 @@
-from django.test import TestCase
+import datetime
+import threading
+from unittest import mock
 
-# Create your tests here.
+import orjson
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError
+from django.test import SimpleTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from . import services
+from .models import FoodItem, FoodEntry, DailySummary
+
+DAY = datetime.date(2025, 8, 20)
+NEXT_DAY = datetime.date(2025, 8, 21)
+
+APPLE = {
+    "food_name": "apple", "tag_id": "384", "serving_weight_grams": 200,
+    "nf_calories": 100, "nf_protein": 1, "nf_total_carbohydrate": 20, "nf_total_fat": 2,
+}
+
+
+def nutritionix_response(content):
+    response = mock.Mock(status_code=200, content=content)
+    response.raise_for_status.return_value = None
+    return response
+
+
+class SummaryTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pw")
+        self.client.force_authenticate(self.user)
+        FoodItem.objects.create(
+            source="local", source_food_id="rice", name="Rice",
+            carbs_per_100g=28, protein_per_100g=3, fat_per_100g=1, calories_per_100g=130,
+        )
+
+    def summary(self, date):
+        return DailySummary.objects.get(user=self.user, date=date)
+
+    def log_entry(self, amount_g, date=DAY):
+        response = self.client.post(
+            reverse("foodentry-list"),
+            {"food": "rice", "amount_g": amount_g, "date": date},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data["id"]
+
+
+class FoodEntrySummaryTests(SummaryTestCase):
+    def test_create_adds_to_summary(self):
+        self.log_entry(200)
+        self.log_entry(100)
+
+        summary = self.summary(DAY)
+        self.assertAlmostEqual(summary.total_calories, 390.0)
+        self.assertAlmostEqual(summary.total_carbs_g, 84.0)
+        self.assertAlmostEqual(summary.total_protein_g, 9.0)
+        self.assertAlmostEqual(summary.total_fat_g, 3.0)
+
+    def test_same_date_update_keeps_totals(self):
+        entry_id = self.log_entry(200)
+
+        response = self.client.patch(
+            reverse("foodentry-detail", args=[entry_id]),
+            {"timestamp": "2025-08-20T12:00:00Z"},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertAlmostEqual(self.summary(DAY).total_calories, 260.0)
+
+    def test_date_change_moves_totals(self):
+        entry_id = self.log_entry(200)
+        self.log_entry(100)
+
+        response = self.client.patch(
+            reverse("foodentry-detail", args=[entry_id]), {"date": NEXT_DAY}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertAlmostEqual(self.summary(DAY).total_calories, 130.0)
+        self.assertAlmostEqual(self.summary(NEXT_DAY).total_calories, 260.0)
+
+    def test_delete_subtracts_and_clamps_at_zero(self):
+        entry_id = self.log_entry(200)
+        other_id = self.log_entry(100)
+
+        self.client.delete(reverse("foodentry-detail", args=[entry_id]))
+        self.assertAlmostEqual(self.summary(DAY).total_calories, 130.0)
+
+        DailySummary.objects.filter(user=self.user, date=DAY).update(total_calories=50.0)
+        self.client.delete(reverse("foodentry-detail", args=[other_id]))
+        self.assertEqual(self.summary(DAY).total_calories, 0.0)
+
+
+class NutritionixUpsertTests(SummaryTestCase):
+    def post_food(self, food):
+        return self.client.post(
+            reverse("foodentry-list"), {"food": food, "amount_g": 100, "date": DAY}, format="json"
+        )
+
+    @mock.patch("nutrition.serializers.fetch_nutritionix", return_value=[APPLE])
+    def test_entry_for_cached_tag_reuses_item(self, _fetch):
+        FoodItem.objects.create(source="nutritionix", source_food_id="384", name="apple")
+
+        # "a medium apple" is too far from "apple" for the trigram match
+        response = self.post_food("a medium apple")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(FoodItem.objects.filter(source="nutritionix").count(), 1)
+        self.assertAlmostEqual(FoodItem.objects.get(source_food_id="384").calories_per_100g, 50.0)
+
+    @mock.patch("nutrition.serializers.fetch_nutritionix")
+    def test_entries_for_untagged_foods(self, fetch):
+        untagged = {key: value for key, value in APPLE.items() if key != "tag_id"}
+        fetch.side_effect = lambda query: [{**untagged, "food_name": query}]
+
+        self.assertEqual(self.post_food("homemade granola").status_code, 201)
+        self.assertEqual(self.post_food("grandma's stew").status_code, 201)
+        self.assertEqual(self.post_food("Homemade Granola").status_code, 201)
+
+        items = FoodItem.objects.filter(source="nutritionix")
+        self.assertEqual(sorted(items.values_list("name_normalized", flat=True)),
+                         ["grandma's stew", "homemade granola"])
+        self.assertFalse(items.exclude(source_food_id=None).exists())
+
+    @mock.patch("nutrition.views.fetch_nutritionix", return_value=[APPLE])
+    def test_log_food_upserts_tagged_items(self, _fetch):
+        self.client.post(reverse("log_food"), {"query": "apple"}, format="json")
+        self.client.post(reverse("log_food"), {"query": "apple"}, format="json")
+
+        self.assertEqual(FoodItem.objects.filter(source="nutritionix", source_food_id="384").count(), 1)
+        self.assertEqual(FoodEntry.objects.filter(user=self.user).count(), 2)
+
+
+class ResyncSummariesTests(SummaryTestCase):
+    def test_check_passes_when_in_sync(self):
+        self.log_entry(200)
+
+        call_command("resync_summaries", "--check", stdout=mock.Mock())
+
+    def test_check_fails_on_drift(self):
+        self.log_entry(200)
+        DailySummary.objects.filter(user=self.user, date=DAY).update(total_calories=1.0)
+
+        with self.assertRaises(CommandError) as ctx:
+            call_command("resync_summaries", "--check", stdout=mock.Mock())
+        self.assertEqual(ctx.exception.returncode, 1)
+        self.assertEqual(self.summary(DAY).total_calories, 1.0)
+
+    def test_resync_rewrites_only_drifted_rows(self):
+        self.log_entry(200)
+        self.log_entry(100, date=NEXT_DAY)
+        in_sync = self.summary(NEXT_DAY)
+        DailySummary.objects.filter(user=self.user, date=DAY).update(total_calories=1.0)
+
+        call_command("resync_summaries", stdout=mock.Mock())
+
+        self.assertAlmostEqual(self.summary(DAY).total_calories, 260.0)
+        self.assertEqual(self.summary(NEXT_DAY).updated_at, in_sync.updated_at)
+
+    def test_resync_creates_missing_rows(self):
+        self.log_entry(200)
+        DailySummary.objects.all().delete()
+
+        call_command("resync_summaries", stdout=mock.Mock())
+
+        self.assertAlmostEqual(self.summary(DAY).total_calories, 260.0)
+
+
+class FetchNutritionixTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(services, "_get_session")
+        self.session = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def test_repeated_query_is_served_from_cache(self):
+        self.session.post.return_value = nutritionix_response(
+            orjson.dumps({"foods": [{**APPLE, "photo": {"thumb": "x"}}]})
+        )
+
+        first = services.fetch_nutritionix("Apple")
+        second = services.fetch_nutritionix("  apple ")
+
+        self.assertEqual(first, [APPLE])
+        self.assertEqual(second, [APPLE])
+        self.session.post.assert_called_once()
+
+    @mock.patch.object(services, "cache")
+    def test_empty_results_use_short_ttl(self, mock_cache):
+        mock_cache.get.return_value = None
+        self.session.post.return_value = nutritionix_response(orjson.dumps({"foods": []}))
+
+        self.assertEqual(services.fetch_nutritionix("aplpe"), [])
+        mock_cache.set.assert_called_once_with(mock.ANY, [], services.NUTRITIONIX_EMPTY_CACHE_TTL)
+
+    @mock.patch.object(services, "cache")
+    def test_results_use_long_ttl(self, mock_cache):
+        mock_cache.get.return_value = None
+        self.session.post.return_value = nutritionix_response(orjson.dumps({"foods": [APPLE]}))
+
+        services.fetch_nutritionix("apple")
+        mock_cache.set.assert_called_once_with(mock.ANY, [APPLE], services.NUTRITIONIX_CACHE_TTL)
+
+
+class DailySummariesSinceTests(SummaryTestCase):
+    def test_since_filters_older_days(self):
+        self.log_entry(100)
+        self.log_entry(200, date=NEXT_DAY)
+
+        response = self.client.get(reverse("daily-summaries"), {"since": "2025-08-21"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["date"] for row in response.data], [NEXT_DAY])
+        self.assertAlmostEqual(response.data[0]["total_calories"], 260.0)
+
+    def test_without_since_returns_all_days_newest_first(self):
+        self.log_entry(100)
+        self.log_entry(200, date=NEXT_DAY)
+
+        response = self.client.get(reverse("daily-summaries"))
+
+        self.assertEqual([row["date"] for row in response.data], [NEXT_DAY, DAY])
+
+    def test_invalid_since_is_rejected(self):
+        response = self.client.get(reverse("daily-summaries"), {"since": "21/08/2025"})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class DailySummaryEndpointTests(SummaryTestCase):
+    def test_lists_stored_totals(self):
+        self.log_entry(200)
+
+        response = self.client.get(reverse("dailysummary-list"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["date"], DAY.isoformat())
+        self.assertAlmostEqual(response.data[0]["total_calories"], 260.0)
+
+    def test_scoped_to_requesting_user(self):
+        other = User.objects.create_user(username="bob", password="pw")
+        theirs = DailySummary.objects.create(user=other, date=DAY, total_calories=500.0)
+        self.log_entry(200)
+
+        response = self.client.get(reverse("dailysummary-list"))
+        self.assertEqual([row["user"] for row in response.data], [self.user.pk])
+
+        response = self.client.get(reverse("dailysummary-detail", args=[theirs.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_read_only(self):
+        response = self.client.post(
+            reverse("dailysummary-list"), {"date": DAY, "total_calories": 1}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 405)
+
+    @mock.patch("nutrition.views.fetch_nutritionix", return_value=[APPLE, APPLE])
+    def test_log_food_updates_summary(self, _fetch):
+        response = self.client.post(reverse("log_food"), {"query": "2 apples"}, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["entries"]), 2)
+        self.assertAlmostEqual(self.summary(timezone.now().date()).total_calories, 200.0)
+
+
+class MacroConstraintTests(SummaryTestCase):
+    def test_non_positive_amount_is_rejected(self):
+        for amount_g in (0, -50):
+            response = self.client.post(
+                reverse("foodentry-list"),
+                {"food": "rice", "amount_g": amount_g, "date": DAY},
+                format="json",
+            )
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(FoodEntry.objects.exists())
+
+    def test_database_rejects_negative_macros(self):
+        entry = FoodEntry(
+            user=self.user, date=DAY, name="rice", weight_g=100,
+            carbs_g=-1, protein_g=0, fat_g=0, calories=0,
+        )
+
+        with self.assertRaises(IntegrityError):
+            FoodEntry.objects.bulk_create([entry])
+
+
+class NutritionixDecodeErrorTests(SummaryTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        patcher = mock.patch.object(services, "_get_session")
+        session = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        session.post.return_value = nutritionix_response(b"<html>upstream error</html>")
+
+    def test_log_food_returns_bad_gateway(self):
+        response = self.client.post(reverse("log_food"), {"query": "apple"}, format="json")
+
+        self.assertEqual(response.status_code, 502)
+
+    def test_search_returns_bad_gateway(self):
+        response = self.client.get(reverse("fooditem-search-external"), {"q": "apple"})
+
+        self.assertEqual(response.status_code, 502)
+
+
+class LocalFoodMatchTests(SummaryTestCase):
+    @mock.patch("nutrition.serializers.fetch_nutritionix")
+    def test_close_name_uses_trigram_match(self, fetch):
+        # similarity("rices", "rice") = 4/7, above the 0.5 cut-off
+        response = self.client.post(
+            reverse("foodentry-list"), {"food": "Rices", "amount_g": 100, "date": DAY}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["name"], "Rice")
+        fetch.assert_not_called()
+
+    @mock.patch("nutrition.serializers.fetch_nutritionix", return_value=[APPLE])
+    def test_distant_name_falls_back_to_nutritionix(self, fetch):
+        # similarity("rice pudding", "rice") = 5/13: passes the % operator, not the cut-off
+        response = self.client.post(
+            reverse("foodentry-list"), {"food": "rice pudding", "amount_g": 100, "date": DAY}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["name"], "apple")
+        fetch.assert_called_once_with("rice pudding")
+
+
+class ResolveLocalFoodsTests(SummaryTestCase):
+    def test_exact_trigram_and_missing_names(self):
+        rice = FoodItem.objects.get(name="Rice")
+        oats = FoodItem.objects.create(source="local", source_food_id="oats", name="Rolled oats")
+
+        with self.assertNumQueries(3):  # one exact lookup, one trigram lookup per miss
+            found = services.resolve_local_foods([" RICE ", "rolled oatss", "kombucha"])
+
+        self.assertEqual(found, {"rice": rice, "rolled oatss": oats})
+
+
+class BulkLogTests(SummaryTestCase):
+    def test_bulk_log_updates_summary_per_date(self):
+        response = self.client.post(reverse("foodentry-bulk-log"), {"entries": [
+            {"food": "rice", "amount_g": 200, "date": DAY},
+            {"food": "Rice ", "amount_g": 100, "date": DAY},
+            {"food": "rice", "amount_g": 100, "date": NEXT_DAY},
+        ]}, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 3)
+        self.assertAlmostEqual(self.summary(DAY).total_calories, 390.0)
+        self.assertAlmostEqual(self.summary(NEXT_DAY).total_calories, 130.0)
+
+    @mock.patch("nutrition.services.fetch_nutritionix", return_value=[APPLE])
+    def test_bulk_log_fetches_unknown_foods(self, fetch):
+        response = self.client.post(reverse("foodentry-bulk-log"), {"entries": [
+            {"food": "apple", "amount_g": 100, "date": DAY},
+            {"food": "rice", "amount_g": 100, "date": DAY},
+        ]}, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        fetch.assert_called_once_with("apple")
+        self.assertAlmostEqual(self.summary(DAY).total_calories, 180.0)
+
+    @mock.patch("nutrition.services.fetch_nutritionix")
+    def test_bulk_log_fetches_on_shared_pool(self, fetch):
+        threads = set()
+
+        def fetch_on_thread(query):
+            threads.add(threading.current_thread().name)
+            return [{**APPLE, "tag_id": query}]
+
+        fetch.side_effect = fetch_on_thread
+        for day in (DAY, NEXT_DAY):
+            self.client.post(reverse("foodentry-bulk-log"), {"entries": [
+                {"food": f"pear {day}", "amount_g": 100, "date": day},
+                {"food": f"plum {day}", "amount_g": 100, "date": day},
+            ]}, format="json")
+
+        self.assertEqual(fetch.call_count, 4)
+        self.assertTrue(all(name.startswith("nutritionix") for name in threads))
+
+    @mock.patch("nutrition.services.fetch_nutritionix", return_value=[])
+    def test_bulk_log_rejects_unknown_foods(self, _fetch):
+        response = self.client.post(reverse("foodentry-bulk-log"), {"entries": [
+            {"food": "zzzz", "amount_g": 100, "date": DAY},
+        ]}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(FoodEntry.objects.exists())
+
+    def test_bulk_log_rejects_non_object_body(self):
+        response = self.client.post(
+            reverse("foodentry-bulk-log"),
+            [{"food": "rice", "amount_g": 100, "date": DAY}],
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 400)
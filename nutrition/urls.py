@@ -1,10 +1,11 @@
 from rest_framework.routers import DefaultRouter
-from .views import FoodItemViewSet, FoodEntryViewSet, log_food, daily_summaries, register_user
+from .views import FoodItemViewSet, FoodEntryViewSet, DailySummaryViewSet, log_food, daily_summaries, register_user
 from django.urls import path
 
 router = DefaultRouter()
 router.register(r"food-items", FoodItemViewSet, basename="fooditem")
 router.register(r"entries", FoodEntryViewSet, basename="foodentry")
+router.register(r"summaries", DailySummaryViewSet, basename="dailysummary")
 
 urlpatterns = [
     path("log-food/", log_food, name="log_food"),
@@ -1,18 +1,52 @@
 import requests
-from django.conf import settings
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from django.contrib.auth.models import User
 from rest_framework import status, viewsets, filters
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
-from django.db.models import Sum
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.forms.models import model_to_dict
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from .models import FoodItem, FoodEntry, DailySummary
 from .serializers import FoodItemSerializer, FoodEntrySerializer, DailySummarySerializer
+from .services import (
+    fetch_nutritionix, fetch_nutritionix_many, food_item_from_nutritionix,
+    resolve_local_foods, upsert_tagged_items,
+)
+
+# FoodEntry macro field -> DailySummary running total it feeds
+SUMMARY_TOTALS = {
+    "calories": "total_calories",
+    "carbs_g": "total_carbs_g",
+    "protein_g": "total_protein_g",
+    "fat_g": "total_fat_g",
+}
+
+
+def _apply_summary_delta(user, date, deltas, create=True, clamp=False):
+    """
+    Add per-field deltas to the user's DailySummary for `date` in a single UPDATE.
+    Creates the row when missing (if `create`); `clamp` keeps totals from going below zero.
+    """
+    changes = {}
+    for field, delta in deltas.items():
+        expr = F(field) + delta
+        changes[field] = Greatest(expr, Value(0.0)) if clamp else expr
+
+    summaries = DailySummary.objects.filter(user=user, date=date)
+    if summaries.update(**changes, updated_at=timezone.now()) or not create:
+        return
+    try:
+        with transaction.atomic():
+            DailySummary.objects.create(user=user, date=date, **deltas)
+    except IntegrityError:
+        # another request created the row first; apply the delta to it
+        summaries.update(**changes, updated_at=timezone.now())
 
 
 class FoodItemViewSet(viewsets.ModelViewSet):
@@ -32,26 +66,16 @@ class FoodItemViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        url = "https://trackapi.nutritionix.com/v2/natural/nutrients"
-        headers = {
-            "x-app-id": settings.NUTRITIONIX_APP_ID,
-            "x-app-key": settings.NUTRITIONIX_API_KEY,
-            "Content-Type": "application/json",
-        }
-        payload = {"query": q}
-
         try:
-            r = requests.post(url, headers=headers, json=payload, timeout=10)
-            r.raise_for_status()
+            foods = fetch_nutritionix(q)
         except requests.RequestException:
             return Response(
                 {"error": "Nutritionix request failed"},
                 status=status.HTTP_502_BAD_GATEWAY,
             )
 
-        data = r.json()
         results = []
-        for food in data.get("foods", []):
+        for food in foods:
             weight = float(food.get("serving_weight_grams") or 1)
             results.append({
                 "name": food.get("food_name") or q,
@@ -83,8 +107,9 @@ class FoodEntryViewSet(viewsets.ModelViewSet):
             self._update_summary_on_create(instance)
 
     def perform_update(self, serializer):
+        # snapshot before save() mutates the instance in place, instead of re-reading the row
+        previous = model_to_dict(serializer.instance, fields=["date", *SUMMARY_TOTALS])
         with transaction.atomic():
-            previous = FoodEntry.objects.get(pk=serializer.instance.pk)
             instance = serializer.save()
             self._update_summary_on_update(previous, instance)
 
@@ -94,40 +119,34 @@ class FoodEntryViewSet(viewsets.ModelViewSet):
             instance.delete()
 
     def _update_summary_on_create(self, entry):
-        summary, _ = DailySummary.objects.get_or_create(user=entry.user, date=entry.date)
-        summary.total_calories += entry.calories or 0.0
-        summary.total_carbs_g += entry.carbs_g or 0.0
-        summary.total_protein_g += entry.protein_g or 0.0
-        summary.total_fat_g += entry.fat_g or 0.0
-        summary.save()
+        _apply_summary_delta(entry.user, entry.date, {
+            total: getattr(entry, field) or 0.0 for field, total in SUMMARY_TOTALS.items()
+        })
 
     def _update_summary_on_update(self, previous, updated):
-        if previous.date != updated.date:
-            self._update_summary_on_delete(previous)
-            self._update_summary_on_create(updated)
+        if previous["date"] != updated.date:
+            def remove_previous():
+                _apply_summary_delta(updated.user, previous["date"], {
+                    total: -(previous[field] or 0.0) for field, total in SUMMARY_TOTALS.items()
+                }, create=False, clamp=True)
+
+            # touch the two days in date order, the order resync_summaries locks them in
+            if previous["date"] < updated.date:
+                remove_previous()
+                self._update_summary_on_create(updated)
+            else:
+                self._update_summary_on_create(updated)
+                remove_previous()
         else:
-            delta_cal = (updated.calories or 0) - (previous.calories or 0)
-            delta_carbs = (updated.carbs_g or 0) - (previous.carbs_g or 0)
-            delta_protein = (updated.protein_g or 0) - (previous.protein_g or 0)
-            delta_fat = (updated.fat_g or 0) - (previous.fat_g or 0)
-
-            summary, _ = DailySummary.objects.get_or_create(user=updated.user, date=updated.date)
-            summary.total_calories += delta_cal
-            summary.total_carbs_g += delta_carbs
-            summary.total_protein_g += delta_protein
-            summary.total_fat_g += delta_fat
-            summary.save()
+            _apply_summary_delta(updated.user, updated.date, {
+                total: (getattr(updated, field) or 0.0) - (previous[field] or 0.0)
+                for field, total in SUMMARY_TOTALS.items()
+            })
 
     def _update_summary_on_delete(self, entry):
-        try:
-            summary = DailySummary.objects.get(user=entry.user, date=entry.date)
-        except DailySummary.DoesNotExist:
-            return
-        summary.total_calories = max(summary.total_calories - (entry.calories or 0), 0.0)
-        summary.total_carbs_g = max(summary.total_carbs_g - (entry.carbs_g or 0), 0.0)
-        summary.total_protein_g = max(summary.total_protein_g - (entry.protein_g or 0), 0.0)
-        summary.total_fat_g = max(summary.total_fat_g - (entry.fat_g or 0), 0.0)
-        summary.save()
+        _apply_summary_delta(entry.user, entry.date, {
+            total: -(getattr(entry, field) or 0.0) for field, total in SUMMARY_TOTALS.items()
+        }, create=False, clamp=True)
 
     @action(detail=False, methods=["get"], url_path="today-summary")
     def today_summary(self, request):
@@ -142,27 +161,22 @@ class FoodEntryViewSet(viewsets.ModelViewSet):
         else:
             date = timezone.localdate()
 
+        # single SUM() pass served by an index-only scan on fe_user_date_macros_cov
         entries = FoodEntry.objects.filter(user=request.user, date=date)
         totals = entries.aggregate(
-            total_calories=Sum("calories"),
-            total_carbs_g=Sum("carbs_g"),
-            total_protein_g=Sum("protein_g"),
-            total_fat_g=Sum("fat_g"),
+            total_calories=Coalesce(Sum("calories"), Value(0.0)),
+            total_carbs_g=Coalesce(Sum("carbs_g"), Value(0.0)),
+            total_protein_g=Coalesce(Sum("protein_g"), Value(0.0)),
+            total_fat_g=Coalesce(Sum("fat_g"), Value(0.0)),
         )
 
-        return Response({
-            "date": date,
-            "total_calories": totals["total_calories"] or 0.0,
-            "total_carbs_g": totals["total_carbs_g"] or 0.0,
-            "total_protein_g": totals["total_protein_g"] or 0.0,
-            "total_fat_g": totals["total_fat_g"] or 0.0,
-        })
+        return Response({"date": date, **totals})
 
     @action(detail=False, methods=["get"], url_path="today")
     def today_entries(self, request):
         """Return the list of food entries for today only."""
         today = timezone.localdate()
-        entries = FoodEntry.objects.filter(user=request.user, date=today).order_by("-timestamp")
+        entries = self.get_queryset().filter(date=today).order_by("-timestamp")
         serializer = self.get_serializer(entries, many=True)
         return Response(serializer.data)
 
@@ -179,10 +193,125 @@ class FoodEntryViewSet(viewsets.ModelViewSet):
         except ValueError:
             return Response({"detail": "Invalid date format; use YYYY-MM-DD."}, status=400)
 
-        entries = FoodEntry.objects.filter(user=request.user, date=date).order_by("-timestamp")
+        entries = self.get_queryset().filter(date=date).order_by("-timestamp")
         serializer = self.get_serializer(entries, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk_log(self, request):
+        """
+        Log several foods in one request: {"entries": [{"food", "amount_g", "date"}, ...]}.
+        Unknown foods are fetched from Nutritionix concurrently, then everything commits at once.
+        """
+        if not isinstance(request.data, dict):
+            return Response(
+                {"detail": 'Expected an object of the form {"entries": [...]}.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        serializer = self.get_serializer(
+            data=request.data.get("entries", []), many=True, allow_empty=False
+        )
+        serializer.is_valid(raise_exception=True)
+        rows = serializer.validated_data
+
+        # first query per normalized name, in request order
+        queries = {}
+        for row in rows:
+            queries.setdefault(FoodItem.normalize_name(row["food"]), row["food"])
+
+        items_by_name = resolve_local_foods(queries.values())
+
+        missing = [name for name in queries if name not in items_by_name]
+        if missing:
+            try:
+                fetched = dict(zip(missing, fetch_nutritionix_many([queries[name] for name in missing])))
+            except requests.RequestException:
+                return Response({"error": "Nutritionix request failed"}, status=status.HTTP_502_BAD_GATEWAY)
+
+            not_found = [queries[name] for name, foods in fetched.items() if not foods]
+            if not_found:
+                return Response(
+                    {"food": [f"{food} not found in Nutritionix" for food in not_found]},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        with transaction.atomic():
+            if missing:
+                # different queries can resolve to the same food: upsert tagged foods
+                # once per tag_id, and key untagged ones by the returned food name
+                tagged = {}
+                tag_for_name = {}
+                untagged = {}
+                untagged_for_name = {}
+                for name, foods in fetched.items():
+                    food = foods[0]
+                    tag_id = (food.get("tag_id") or "").strip()
+                    if tag_id:
+                        tagged.setdefault(tag_id, food_item_from_nutritionix(food, queries[name], tag_id))
+                        tag_for_name[name] = tag_id
+                    else:
+                        food_name = FoodItem.normalize_name(food.get("food_name") or queries[name])
+                        untagged.setdefault(food_name, food_item_from_nutritionix(food, queries[name], None))
+                        untagged_for_name[name] = food_name
+
+                items_by_tag = upsert_tagged_items(list(tagged.values()))
+
+                existing = {}
+                if untagged:
+                    for item in FoodItem.objects.filter(
+                        source="nutritionix", name_normalized__in=untagged
+                    ).order_by("pk"):
+                        existing.setdefault(item.name_normalized, item)
+                FoodItem.objects.bulk_create(
+                    [item for food_name, item in untagged.items() if food_name not in existing]
+                )
+                existing = {**untagged, **existing}
+
+                items_by_name.update({name: items_by_tag[tag] for name, tag in tag_for_name.items()})
+                items_by_name.update({name: existing[food_name] for name, food_name in untagged_for_name.items()})
+
+            items = [items_by_name[FoodItem.normalize_name(row["food"])] for row in rows]
+            macros_list = [item.macros_for_grams(row["amount_g"]) for row, item in zip(rows, items)]
+
+            entries = FoodEntry.objects.bulk_create([
+                FoodEntry(
+                    user=request.user,
+                    food_item=item,
+                    name=item.name,
+                    weight_g=row["amount_g"],
+                    carbs_g=macros["carbs_g"],
+                    protein_g=macros["protein_g"],
+                    fat_g=macros["fat_g"],
+                    calories=macros["calories"],
+                    **{k: v for k, v in row.items() if k not in ("food", "amount_g")},
+                )
+                for row, item, macros in zip(rows, items, macros_list)
+            ])
+
+            # one summary delta per distinct day in the batch, applied in date order
+            # so concurrent writers (and resync_summaries) lock rows in the same order
+            deltas_by_date = {}
+            for entry in entries:
+                deltas = deltas_by_date.setdefault(entry.date, dict.fromkeys(SUMMARY_TOTALS.values(), 0.0))
+                for field, total in SUMMARY_TOTALS.items():
+                    deltas[total] += getattr(entry, field)
+            for date, deltas in sorted(deltas_by_date.items()):
+                _apply_summary_delta(request.user, date, deltas)
+
+        return Response(self.get_serializer(entries, many=True).data, status=status.HTTP_201_CREATED)
+
+
+class DailySummaryViewSet(viewsets.ReadOnlyModelViewSet):
+    """Stored per-day totals, kept in sync by FoodEntryViewSet and log_food."""
+    serializer_class = DailySummarySerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ["date"]
+    ordering_fields = ["date"]
+
+    def get_queryset(self):
+        return DailySummary.objects.filter(user=self.request.user)
+
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
@@ -191,80 +320,86 @@ def log_food(request):
     if not query:
         return Response({"error": "No query provided"}, status=status.HTTP_400_BAD_REQUEST)
 
-    url = "https://trackapi.nutritionix.com/v2/natural/nutrients"
-    headers = {
-        "x-app-id": settings.NUTRITIONIX_APP_ID,
-        "x-app-key": settings.NUTRITIONIX_API_KEY,
-        "Content-Type": "application/json",
-    }
-    payload = {"query": query}
-
     try:
-        r = requests.post(url, headers=headers, json=payload, timeout=10)
-        r.raise_for_status()
+        foods = fetch_nutritionix(query)
     except requests.RequestException:
         return Response({"error": "Nutritionix request failed"}, status=status.HTTP_502_BAD_GATEWAY)
 
-    data = r.json()
-    saved_entries = []
+    today = timezone.now().date()
 
-    for food in data.get("foods", []):
-        weight = float(food.get("serving_weight_grams") or 100)
-        tag_id = (food.get("tag_id") or "").strip()
-        name_normalized = (food.get("food_name") or query).strip().lower()
+    with transaction.atomic():
+        names = {
+            FoodItem.normalize_name(food.get("food_name") or query)
+            for food in foods if not (food.get("tag_id") or "").strip()
+        }
 
-        if tag_id:
-            item, _ = FoodItem.objects.get_or_create(
+        items_by_name = {}
+        if names:
+            for item in FoodItem.objects.filter(
+                source="nutritionix", name_normalized__in=names
+            ).order_by("pk"):
+                items_by_name.setdefault(item.name_normalized, item)
+
+        tagged = {}
+        missing_untagged = {}
+        for food in foods:
+            tag_id = (food.get("tag_id") or "").strip()
+            name_normalized = FoodItem.normalize_name(food.get("food_name") or query)
+            if tag_id:
+                tagged.setdefault(tag_id, food_item_from_nutritionix(food, query, tag_id))
+            elif name_normalized not in items_by_name:
+                missing_untagged.setdefault(name_normalized, food_item_from_nutritionix(food, query, None))
+
+        items_by_tag = upsert_tagged_items(list(tagged.values()))
+        if missing_untagged:
+            FoodItem.objects.bulk_create(missing_untagged.values())
+            items_by_name.update(missing_untagged)
+
+        resolved = []
+        for food in foods:
+            weight = float(food.get("serving_weight_grams") or 100)
+            tag_id = (food.get("tag_id") or "").strip()
+            if tag_id:
+                item = items_by_tag[tag_id]
+            else:
+                item = items_by_name[FoodItem.normalize_name(food.get("food_name") or query)]
+            resolved.append((item, weight, tag_id))
+
+        macros_list = [item.macros_for_grams(weight) for item, weight, _ in resolved]
+
+        entries = FoodEntry.objects.bulk_create([
+            FoodEntry(
+                user=request.user,
+                food_item=item,
+                name=item.name,
+                weight_g=weight,
+                carbs_g=macros["carbs_g"],
+                protein_g=macros["protein_g"],
+                fat_g=macros["fat_g"],
+                calories=macros["calories"],
                 source="nutritionix",
-                source_food_id=tag_id,
-                defaults={
-                    "name": food.get("food_name") or query,
-                    "calories_per_100g": float(food.get("nf_calories", 0)) * (100 / weight),
-                    "protein_per_100g": float(food.get("nf_protein", 0)) * (100 / weight),
-                    "carbs_per_100g": float(food.get("nf_total_carbohydrate", 0)) * (100 / weight),
-                    "fat_per_100g": float(food.get("nf_total_fat", 0)) * (100 / weight),
-                }
+                source_food_id=tag_id or None,
+                date=today,
             )
-        else:
-            item = FoodItem.objects.filter(
-                source="nutritionix",
-                name__iexact=name_normalized
-            ).first()
-
-            if not item:
-                item = FoodItem.objects.create(
-                    source="nutritionix",
-                    source_food_id=None,
-                    name=food.get("food_name") or query,
-                    calories_per_100g=float(food.get("nf_calories", 0)) * (100 / weight),
-                    protein_per_100g=float(food.get("nf_protein", 0)) * (100 / weight),
-                    carbs_per_100g=float(food.get("nf_total_carbohydrate", 0)) * (100 / weight),
-                    fat_per_100g=float(food.get("nf_total_fat", 0)) * (100 / weight),
-                )
+            for (item, weight, tag_id), macros in zip(resolved, macros_list)
+        ])
 
-        macros = item.macros_for_grams(weight)
-
-        entry = FoodEntry.objects.create(
-            user=request.user,
-            food_item=item,
-            name=item.name,
-            weight_g=weight,
-            carbs_g=macros["carbs_g"],
-            protein_g=macros["protein_g"],
-            fat_g=macros["fat_g"],
-            calories=macros["calories"],
-            source="nutritionix",
-            source_food_id=tag_id or None,
-            date=timezone.now().date(),
-        )
+        if entries:
+            _apply_summary_delta(request.user, today, {
+                total: sum(getattr(entry, field) for entry in entries)
+                for field, total in SUMMARY_TOTALS.items()
+            })
 
-        saved_entries.append({
+    saved_entries = [
+        {
             "name": entry.name,
             "calories": entry.calories,
             "protein": entry.protein_g,
             "carbs": entry.carbs_g,
             "fat": entry.fat_g,
-        })
+        }
+        for entry in entries
+    ]
 
     return Response({"entries": saved_entries}, status=201)
 
@@ -272,8 +407,21 @@ def log_food(request):
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def daily_summaries(request):
+    """Per-day macro totals, newest first (optionally only days on/after ?since=YYYY-MM-DD)."""
+    entries = FoodEntry.objects.filter(user=request.user)
+
+    since_str = request.query_params.get("since")
+    if since_str:
+        from datetime import datetime
+        try:
+            since = datetime.strptime(since_str, "%Y-%m-%d").date()
+        except ValueError:
+            return Response({"detail": "Invalid date format; use YYYY-MM-DD."}, status=400)
+        entries = entries.filter(date__gte=since)
+
+    # (user, date) index is scanned backward, so rows arrive pre-grouped for a streaming GroupAggregate
     summaries = (
-        FoodEntry.objects.filter(user=request.user)
+        entries
         .values("date")
         .annotate(
             total_calories=Sum("calories"),